@@ -36,6 +36,7 @@ final_hiddenimports = [
     'scipy',
     'pandas',
     'werkzeug',
+    'waitress',
     'matplotlib',
 ] + collect_submodules('scipy') + collect_submodules('pandas') + collect_submodules('werkzeug') + mne_hiddenimports
 
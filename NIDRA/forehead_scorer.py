@@ -3,10 +3,43 @@ import mne
 import numpy as np
 import logging
 from pathlib import Path
-import onnxruntime as ort
 from NIDRA.plotting import plot_hypnodensity
 from NIDRA import utils
 
+# ZMax two-file recordings end in L.edf / R.edf (any case), optionally after a "_" or " " separator
+L_EDF_RE = re.compile(r'([_ ])?L\.edf$', re.IGNORECASE)
+R_EDF_RE = re.compile(r'([_ ])?R\.edf$', re.IGNORECASE)
+
+def counterpart_name(name):
+    """
+    Name of the other file of a ZMax L/R pair (rec_L.edf <-> rec_R.edf), or None if the name is neither.
+    Only the L/R letter is swapped (keeping its case), so the rest of the name, e.g. '.EDF', is unchanged.
+    """
+    if L_EDF_RE.search(name):
+        side = 'R' if name[-5] == 'L' else 'r'
+    elif R_EDF_RE.search(name):
+        side = 'L' if name[-5] == 'R' else 'l'
+    else:
+        return None
+    return name[:-5] + side + name[-4:]
+
+def find_counterpart(path, edf_files=None):
+    """
+    The other file of a ZMax L/R pair as it is named on disk, or None. Names are compared case-folded
+    (x_L.EDF pairs with x_r.edf), as on the case-insensitive filesystems of Windows and macOS.
+    """
+    path = Path(path)
+    other = counterpart_name(path.name)
+    if other is None:
+        return None
+    if edf_files is None:
+        try:
+            edf_files = utils.list_edfs(path.parent)
+        except OSError:
+            return None
+    other = other.lower()
+    return next((f for f in edf_files if f.name.lower() == other), None)
+
 class ForeheadScorer:
     def __init__(self, input = None, output: str = None, channels: list = None,
                  sfreq: float = None, model: str = "ez6moe",
@@ -72,25 +105,21 @@ class ForeheadScorer:
 
     def _detect_forehead_mode(self, input_path: Path):
         if input_path.is_dir():
-            edf_files = sorted(input_path.glob("*.edf"))
+            edf_files = utils.list_edfs(input_path)
             if not edf_files:
                 raise FileNotFoundError(f"Could not find an EDF file in directory '{input_path}'.")
+            # the listing already holds every EDF in the folder, so look counterparts up in it
+            # instead of an exists() call per L file
             for f in edf_files:
-                if re.search(r'(?i)([_\s]?)L\.edf$', f.name):
-                    candidate_r = f.with_name(re.sub(r'(?i)([_\s]?)L\.edf$', r'\1R.edf', f.name))
-                    if candidate_r.exists():
-                        return 'two_files', f
+                if L_EDF_RE.search(f.name) and find_counterpart(f, edf_files):
+                    return 'two_files', f
             return 'one_file', edf_files[0]
         else:
-            name_str = str(input_path)
-            if re.search(r'(?i)([_ ])?L\.edf$', name_str):
-                candidate_r = Path(re.sub(r'(?i)([_ ])?L\.edf$', r'\1R.edf', name_str))
-                if candidate_r.exists():
+            other = find_counterpart(input_path)
+            if other:
+                if L_EDF_RE.search(input_path.name):
                     return 'two_files', input_path
-            if re.search(r'(?i)([_ ])?R\.edf$', name_str):
-                candidate_l = Path(re.sub(r'(?i)([_ ])?R\.edf$', r'\1L.edf', name_str))
-                if candidate_l.exists():
-                    return 'two_files', candidate_l
+                return 'two_files', other
             return 'one_file', input_path
 
     def _load_recording(self):
@@ -114,9 +143,9 @@ class ForeheadScorer:
         # Two-file mode, expects *R.edf and *L.edf in same folder 
         if self.forehead_mode == 'two_files':
             rawL = mne.io.read_raw_edf(self.input, preload=True, verbose=False)
-            rawR_path = Path(re.sub(r'(?i)([_ ])?L\.edf$', r'\1R.edf', str(self.input)))
-            if not rawR_path.exists():
-                raise FileNotFoundError(f"Could not find corresponding RIGHT channel file at {rawR_path}")
+            rawR_path = find_counterpart(self.input)
+            if rawR_path is None:
+                raise FileNotFoundError(f"Could not find corresponding RIGHT channel file for {self.input}")
             rawR = mne.io.read_raw_edf(rawR_path, preload=True, verbose=False)
             rawL.resample(self.target_fs, verbose=False).filter(l_freq=0.5, h_freq=None, verbose=False)
             rawR.resample(self.target_fs, verbose=False).filter(l_freq=0.5, h_freq=None, verbose=False)
@@ -163,7 +192,7 @@ class ForeheadScorer:
         model_filename = f"{self.model_name}.onnx"
         model_path = utils.get_model_path(model_filename)
         try:
-            self.session = ort.InferenceSession(model_path)
+            self.session = utils.load_onnx_session(model_path)
             self.input_name = self.session.get_inputs()[0].name
             self.output_name = self.session.get_outputs()[0].name
             print(f"Model loaded: '{model_path}'")
@@ -1,20 +1,33 @@
 import sys
 import time
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory
 import threading
+import queue
+import multiprocessing
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Optional
+from concurrent.futures.process import BrokenProcessPool
 import logging
 from pathlib import Path
 import importlib.resources
 import platform
 import os
 import subprocess
-import mne
-import requests
+import mmap
+import functools
+import json
+import uuid
 
 from NIDRA import utils
 
 LOG_FILE, logger = utils.setup_logging()
 
+SYSTEM = platform.system()
+IS_DARWIN = SYSTEM == "Darwin"
+IS_WINDOWS = SYSTEM == "Windows"
+APP_DIR, IS_BUNDLE = utils.get_app_dir()
+
 TEXTS = {
     "WINDOW_TITLE": "NIDRA", "INPUT_TITLE": "Input sleep recordings", "MODEL_TITLE": "Model",
     "OPTIONS_TITLE": "Options", "OPTIONS_PROBS": "Generate hypnodensity", "OPTIONS_PLOT": "Generate graph",
@@ -33,8 +46,8 @@ TEXTS = {
 }
 
 # setup resource paths
-base_path, is_bundle = utils.get_app_dir()
-if is_bundle:
+if IS_BUNDLE:
+    base_path = APP_DIR
     docs_path = base_path / 'docs'
     instance_relative = False
 else:
@@ -53,48 +66,117 @@ app = Flask(
 app.docs_path = docs_path
 
 
-# suppress noisy HTTP request logging
-log = logging.getLogger('werkzeug')
-log.setLevel(logging.ERROR)
+# suppress noisy HTTP request logging. Disabling the logger (rather than raising its level)
+# skips building a log record for every request, e.g. the frequent /status and /log polls.
+logging.getLogger('werkzeug').disabled = True
 
 # --- Global State ---
-is_scoring_running = False
-is_cancelling = False # to give user feedback that cancellation is in progress
-worker_thread = None
-cancel_event = threading.Event()
-_startup_check_done = False
-frontend_url = None
-last_frontend_contact = None
-probe_thread = None
+@dataclass
+class AppState:
+    """State shared by the request handlers and background threads. Change it while holding STATE_LOCK."""
+    scoring_running: bool = False
+    cancelling: bool = False  # to give user feedback that cancellation is in progress
+    worker_future: Optional[Future] = None
+    frontend_url: Optional[str] = None
+    last_frontend_contact: float = field(default_factory=time.monotonic)
+    frontend_watchdog: Optional[threading.Timer] = None
+    startup_info_logged: bool = False
+
+STATE = AppState()
+STATE_LOCK = threading.Lock()
 frontend_grace_period = 60  # seconds
 
+# scoring runs in a spawned child process; the cancel event is shared with it. The event is made in
+# start_background_work, since creating it starts multiprocessing's resource tracker process
+mp_context = multiprocessing.get_context('spawn')
+cancel_event = None
+
 dialog_lock = threading.Lock()
+# dialogs run in the background; the frontend polls /dialog-result/<job_id> for the outcome.
+# One worker is enough, since dialog_lock only ever allows one open dialog.
+dialog_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nidra-dialog")
+dialog_jobs = {}  # job id -> (future, start time)
+dialog_result_ttl = 300  # seconds; finished results nobody fetched (e.g. the tab was closed) are dropped after this
+# tkinter dialogs are served by one long-lived thread that owns a single hidden Tk root
+tk_dialog_requests = queue.Queue()
+tk_dialog_thread = None
+
+# in-flight /get-channels lookups, so repeated clicks on the same input share one EDF read
+channel_requests = {}
+channel_requests_lock = threading.Lock()
+
+# the models are fetched in the background, so they are (usually) on disk before the user starts
+# scoring. Scoring jobs wait on this future.
+background_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="nidra-background")
+model_download_future = None
+
+# the heavy scoring work runs in a separate process, so it never holds this process' GIL and the
+# /status, /log and heartbeat endpoints stay responsive. The process is warmed up (importing mne,
+# onnxruntime, ...) as soon as it starts, so the first scoring run does not pay the startup time.
+scoring_pool = None
+
+def _new_scoring_pool():
+    return ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=mp_context,
+        initializer=utils.init_scoring_worker,
+        initargs=(str(LOG_FILE), cancel_event)
+    )
+
+def _ensure_scoring_pool():
+    """Creates the cancel event and a warmed-up scoring process if they are missing; the caller holds STATE_LOCK."""
+    global cancel_event, scoring_pool
+    if cancel_event is None:
+        cancel_event = mp_context.Event()
+    if scoring_pool is None:
+        scoring_pool = _new_scoring_pool()
+        scoring_pool.submit(utils.preload_scorers)
+
+def start_background_work():
+    """
+    Starts the model download and the scoring process. Called by the launcher (and lazily by the first
+    scoring run), so that importing this module does not spawn a process or touch the network.
+    """
+    global model_download_future
+    with STATE_LOCK:
+        if model_download_future is None:
+            model_download_future = background_executor.submit(utils.download_assets, "models", logger)
+        _ensure_scoring_pool()
+
+def stop_background_work():
+    """Cancels a running job and shuts the scoring process down."""
+    global scoring_pool
+    with STATE_LOCK:
+        pool, scoring_pool = scoring_pool, None
+    if pool is not None:
+        cancel_event.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+# one job at a time; this thread waits for the models and then for the scoring process
+scoring_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nidra-scoring")
 
 # --- Flask Routes ---
 @app.route('/')
 def index():
     """Serves the main HTML page."""
-    global _startup_check_done
-
-    logger.info("-------------------------- System Information --------------------------")
-    logger.info(f"OS: {platform.platform()}")
-    logger.info(f"Python Version: {' '.join(sys.version.splitlines())}")
-    logger.info(f"Python Environment: {sys.prefix}")
-    logger.info(f"Running Directory: {Path.cwd()}")
-    logger.info(f"Log File: {LOG_FILE}")
-    logger.info(f"User Agent: {request.headers.get('User-Agent', 'N/A')}")
-    logger.info("--------------------------------------------------------------------------\n")
-
-    logger.info("\n" + "="*80)
-    logger.info("Welcome to NIDRA, the easy-to-use sleep autoscorer.\nSelect your sleep recordings to begin.\nTo shutdown NIDRA, simply close this window or tab.")
-    logger.info("="*80 + "\n")
-    if not _startup_check_done:
-        _startup_check_done = True
-        threading.Thread(
-            target=utils.download_assets,
-            args=("models", logger),
-            daemon=True
-        ).start()
+    # the system information and welcome message are static, so only log them on the first page load
+    with STATE_LOCK:
+        first_load = not STATE.startup_info_logged
+        STATE.startup_info_logged = True
+    if first_load:
+        logger.info("\n".join([
+            "-------------------------- System Information --------------------------",
+            f"OS: {platform.platform()}",
+            f"Python Version: {' '.join(sys.version.splitlines())}",
+            f"Python Environment: {sys.prefix}",
+            f"Running Directory: {Path.cwd()}",
+            f"Log File: {LOG_FILE}",
+            f"User Agent: {request.headers.get('User-Agent', 'N/A')}",
+            "--------------------------------------------------------------------------\n",
+            "\n" + "="*80,
+            "Welcome to NIDRA, the easy-to-use sleep autoscorer.\nSelect your sleep recordings to begin.\nTo shutdown NIDRA, simply close this window or tab.",
+            "="*80 + "\n"
+        ]))
     return render_template('index.html', texts=TEXTS)
 
 @app.route('/docs/<path:filename>')
@@ -107,10 +189,6 @@ def _open_native_dialog_mac(mode, prompt, file_types=None):
     Opens a native file or folder selection dialog on macOS using AppleScript.
     This approach is thread-safe and avoids issues with tkinter in macOS bundles.
     """
-    if not dialog_lock.acquire(blocking=False):
-        logger.warning("Dialog blocked because another is already open.")
-        return {'status': 'error', 'message': 'Another file dialog is already open.'}
-
     try:
         if mode == 'folder':
             script = f'POSIX path of (choose folder with prompt "{prompt}")'
@@ -134,71 +212,126 @@ def _open_native_dialog_mac(mode, prompt, file_types=None):
     except Exception as e:
         logger.error(f"AppleScript dialog failed (mode: {mode}): {e}", exc_info=True)
         return {'status': 'error', 'message': 'Could not open the dialog.'}
+
+def _run_native_dialog(mode, title, file_types=None):
+    """
+    Shows the dialog and waits for the user; runs on the dialog executor, with dialog_lock held by
+    the request that started it. Returns the result payload and HTTP status code.
+    """
+    try:
+        if IS_DARWIN:
+            mac_file_types = None
+            if file_types:
+                # Convert tkinter-style file types to a simple list of extensions for AppleScript
+                mac_file_types = []
+                for _, patterns in file_types:
+                    mac_file_types.extend(p.split('.')[-1] for p in patterns.split())
+
+            result = _open_native_dialog_mac(
+                mode=mode,
+                prompt=title,
+                file_types=mac_file_types
+            )
+            if result.get('status') == 'error':
+                return result, 409
+            return result, 200
+
+        # For other systems (Windows, Linux), use tkinter on the dedicated dialog thread.
+        global tk_dialog_thread
+        if tk_dialog_thread is None:
+            tk_dialog_thread = threading.Thread(target=_tk_dialog_loop, daemon=True, name="nidra-tk-dialogs")
+            tk_dialog_thread.start()
+
+        result = {}
+        done = threading.Event()
+        tk_dialog_requests.put((mode, title, file_types, result, done))
+        done.wait()
+
+        if 'error' in result:
+            return {'status': 'error', 'message': result['error']}, 500
+        if 'path' in result:
+            return {'status': 'success', 'path': result['path']}, 200
+        else:
+            return {'status': 'cancelled'}, 200
     finally:
-        if dialog_lock.locked():
-            dialog_lock.release()
+        dialog_lock.release()
 
 def _open_native_dialog(mode, title, file_types=None):
-    if platform.system() == "Darwin":
-        mac_file_types = None
-        if file_types:
-            # Convert tkinter-style file types to a simple list of extensions for AppleScript
-            mac_file_types = []
-            for _, patterns in file_types:
-                mac_file_types.extend(p.split('.')[-1] for p in patterns.split())
-        
-        result = _open_native_dialog_mac(
-            mode=mode,
-            prompt=title,
-            file_types=mac_file_types
-        )
-        if result.get('status') == 'error':
-            return jsonify(result), 409
-        return jsonify(result)
-
-    # For other systems (Windows, Linux), use tkinter in a separate thread.
+    """
+    Starts a dialog in the background and answers 202 with a job id right away, so no request
+    thread is held while the user browses. The result is fetched from /dialog-result/<job_id>.
+    """
     if not dialog_lock.acquire(blocking=False):
         logger.warning("File dialog blocked because another is already open.")
         return jsonify({'status': 'error', 'message': 'Another file dialog is already open.'}), 409
 
     try:
-        result = {}
-        def open_dialog_thread():
-            import tkinter as tk
-            from tkinter import filedialog
-            try:
+        future = dialog_executor.submit(_run_native_dialog, mode, title, file_types)
+    except Exception:
+        dialog_lock.release()
+        raise
+    job_id = uuid.uuid4().hex
+    now = time.monotonic()
+    # drop finished dialogs whose result was never fetched, so they do not pile up
+    for stale_id, (stale, started) in list(dialog_jobs.items()):
+        if stale.done() and now - started > dialog_result_ttl:
+            dialog_jobs.pop(stale_id, None)
+    dialog_jobs[job_id] = (future, now)
+    return jsonify({'status': 'pending', 'job_id': job_id}), 202
+
+@app.route('/dialog-result/<job_id>')
+def dialog_result(job_id):
+    """Returns the outcome of a dialog started by /select-directory or /select-input-file."""
+    job = dialog_jobs.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Unknown dialog.'}), 404
+    future = job[0]
+    if not future.done():
+        return jsonify({'status': 'pending', 'job_id': job_id}), 202
+    dialog_jobs.pop(job_id, None)
+    try:
+        result, code = future.result()
+    except Exception as e:
+        logger.error(f"File dialog failed: {e}", exc_info=True)
+        return jsonify({'status': 'error', 'message': 'Could not open the dialog.'}), 500
+    return jsonify(result), code
+
+def _tk_dialog_loop():
+    """
+    Serves tkinter dialog requests. Tk is not thread-safe, so the hidden root is created once and only
+    ever used from this thread; later dialogs skip the Tk startup cost.
+    """
+    import tkinter as tk
+    from tkinter import filedialog
+    root = None
+    while True:
+        mode, title, file_types, result, done = tk_dialog_requests.get()
+        try:
+            if root is None:
                 root = tk.Tk()
                 root.withdraw()  # Hide the main window
                 root.attributes('-topmost', True)  # Bring the dialog to the front
 
-                path = None
-                if mode == 'folder':
-                    path = filedialog.askdirectory(title=title)
-                elif mode == 'file':
-                    path = filedialog.askopenfilename(title=title, filetypes=file_types)
+            path = None
+            if mode == 'folder':
+                path = filedialog.askdirectory(parent=root, title=title)
+            elif mode == 'file':
+                path = filedialog.askopenfilename(parent=root, title=title, filetypes=file_types)
+            root.update()  # let the closed dialog window go away
 
-                if path:
-                    result['path'] = path
-            except Exception as e:
-                logger.error(f"An error occurred in the tkinter dialog thread: {e}", exc_info=True)
-                result['error'] = "Could not open the file dialog. Please ensure you have a graphical environment configured."
-            finally:
-                if 'root' in locals() and root:
+            if path:
+                result['path'] = path
+        except Exception as e:
+            logger.error(f"An error occurred in the tkinter dialog thread: {e}", exc_info=True)
+            result['error'] = "Could not open the file dialog. Please ensure you have a graphical environment configured."
+            if root is not None:
+                try:
                     root.destroy()
-
-        dialog_thread = threading.Thread(target=open_dialog_thread)
-        dialog_thread.start()
-        dialog_thread.join()
-
-        if 'error' in result:
-            return jsonify({'status': 'error', 'message': result['error']}), 500
-        if 'path' in result:
-            return jsonify({'status': 'success', 'path': result['path']})
-        else:
-            return jsonify({'status': 'cancelled'})
-    finally:
-        if dialog_lock.locked():
-            dialog_lock.release()
+                except Exception:
+                    pass
+                root = None  # start over with a fresh root on the next request
+        finally:
+            done.set()
 
 @app.route('/select-directory')
 def select_directory():
@@ -224,49 +357,66 @@ def select_input_file():
 @app.route('/start-scoring', methods=['POST'])
 def start_scoring():
     """Starts the scoring process in a background thread."""
-    global is_scoring_running, worker_thread, cancel_event, is_cancelling
-
-    if is_scoring_running:
-        return jsonify({'status': 'error', 'message': 'Scoring is already in progress.'}), 409
-
     data = request.json
     required_keys = ['input_dir', 'output', 'data_source', 'model', 'score_subdirs']
     if not all(key in data for key in required_keys):
         return jsonify({'status': 'error', 'message': 'Missing required parameters.'}), 400
 
-    is_scoring_running = True
-    is_cancelling = False
-    cancel_event.clear()
+    start_background_work()
+    # check-and-set under the lock, so two quick /start-scoring requests cannot both start a job
+    with STATE_LOCK:
+        if STATE.scoring_running:
+            return jsonify({'status': 'error', 'message': 'Scoring is already in progress.'}), 409
+        STATE.scoring_running = True
+        STATE.cancelling = False
+        cancel_event.clear()
     logger.info("\n" + "=" * 80 + "\nStarting new scoring process on python backend...\n" + "=" * 80)
 
-    def _run_scoring(config, cancel_event_obj):
-        """The actual scoring logic that runs in a separate thread."""
-        global is_scoring_running, is_cancelling
+    def _run_scoring(config):
+        """Hands the job to the scoring process and waits for it to finish."""
+        global scoring_pool
+        with STATE_LOCK:
+            pool = scoring_pool
         try:
+            if not model_download_future.done():
+                logger.info("Waiting for model download to finish...")
+                wait([model_download_future])
+            # download_assets returns None when a file could not be fetched (and has logged why)
+            if model_download_future.exception() is not None or model_download_future.result() is None:
+                logger.error("The models are unavailable, so scoring cannot start. Check the internet "
+                             "connection and restart NIDRA to retry the download.")
+                return
             scorer_type = 'psg' if config['data_source'] == TEXTS["DATA_SOURCE_PSG"] else 'forehead'
-            batch = utils.batch_scorer(
+            pool.submit(
+                utils.run_scoring_job,
                 input=config['input_dir'],
                 output=config['output'],
                 type=scorer_type,
                 model=config['model'],
                 channels=config.get('channels'),
                 hypnodensity=config.get('hypnodensity', False),
-                plot=config.get('plot', False),
-                cancel_event=cancel_event_obj
-            )
-            batch.score()
-
+                plot=config.get('plot', False)
+            ).result()
+
+        except BrokenProcessPool:
+            logger.error("The scoring process stopped unexpectedly. It will be restarted for the next run.")
+            with STATE_LOCK:
+                # unless it was already replaced or shut down meanwhile
+                if scoring_pool is pool:
+                    scoring_pool = None
+                    _ensure_scoring_pool()
         except Exception as e:
             logger.error(f"A critical error occurred in the scoring thread: {e}", exc_info=True)
-        finally:
-            is_scoring_running = False
-            is_cancelling = False
 
-    worker_thread = threading.Thread(
-        target=_run_scoring,
-        args=(data, cancel_event)
-    )
-    worker_thread.start()
+    def _on_scoring_done(future):
+        with STATE_LOCK:
+            STATE.scoring_running = False
+            STATE.cancelling = False
+
+    future = scoring_executor.submit(_run_scoring, data)
+    with STATE_LOCK:
+        STATE.worker_future = future
+    future.add_done_callback(_on_scoring_done)
     return jsonify({'status': 'success', 'message': 'Scoring process initiated.'})
 
 
@@ -274,14 +424,14 @@ def start_scoring():
 @app.route('/cancel-scoring', methods=['POST'])
 def cancel_scoring():
     """Signals the scoring process to cancel."""
-    global is_scoring_running, cancel_event, is_cancelling
-    if is_scoring_running:
-        is_cancelling = True
-        cancel_event.set()
-        logger.info("Cancellation request received. Scoring will stop after the current file.")
-        return jsonify({'status': 'success', 'message': 'Cancellation requested.'})
-    else:
-        return jsonify({'status': 'error', 'message': 'No scoring process is running.'}), 409
+    with STATE_LOCK:
+        if STATE.scoring_running:
+            STATE.cancelling = True
+            cancel_event.set()
+        else:
+            return jsonify({'status': 'error', 'message': 'No scoring process is running.'}), 409
+    logger.info("Cancellation request received. Scoring will stop after the current file.")
+    return jsonify({'status': 'success', 'message': 'Cancellation requested.'})
 
 
 @app.route('/open-recent-results', methods=['POST'])
@@ -291,19 +441,24 @@ def open_recent_results():
         if not LOG_FILE.exists():
             return jsonify({'status': 'error', 'message': 'Log file not found.'}), 404
 
+        # Only the last "Results saved to:" line matters, so search backwards through a memory map
+        # instead of reading the whole log.
         last_output_dir = None
-        with open(LOG_FILE, 'r', encoding='utf-8', errors='ignore') as f:
-            for line in f:
-                if "Results saved to:" in line:
+        marker = b"Results saved to:"
+        if LOG_FILE.stat().st_size > 0:  # an empty file cannot be mapped
+            with open(LOG_FILE, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                idx = mm.rfind(marker)
+                if idx != -1:
+                    end = mm.find(b"\n", idx)
                     # Extract the path after the colon and strip whitespace
-                    path_str = line.split("Results saved to:", 1)[1].strip()
+                    path_str = mm[idx + len(marker):end if end != -1 else len(mm)].decode('utf-8', errors='ignore').strip()
                     last_output_dir = Path(path_str)
 
         if last_output_dir and last_output_dir.exists():
             logger.info(f"Opening recent results folder: {last_output_dir}")
-            if platform.system() == "Windows":
+            if IS_WINDOWS:
                 os.startfile(last_output_dir)
-            elif platform.system() == "Darwin":  # macOS
+            elif IS_DARWIN:  # macOS
                 subprocess.run(["open", last_output_dir])
             else:  # Linux and other UNIX-like systems
                 subprocess.run(["xdg-open", last_output_dir])
@@ -325,9 +480,8 @@ def show_example():
     """Downloads example data and returns the path."""
     try:
         # If running as a PyInstaller bundle, use local examples
-        app_dir, is_bundle = utils.get_app_dir()
-        if is_bundle:
-            example_data_path = app_dir / 'examples' / 'test_data_zmax'
+        if IS_BUNDLE:
+            example_data_path = APP_DIR / 'examples' / 'test_data_zmax'
             if example_data_path.exists():
                 logger.info(f"Using local example data from: {example_data_path}")
                 return jsonify({'status': 'success', 'path': str(example_data_path)})
@@ -352,7 +506,8 @@ def show_example():
 def get_channels():
     """
     Reads channel names from the first available EDF file and determines the
-    required channel selection mode.
+    required channel selection mode. Concurrent requests for the same input are
+    answered by a single lookup.
     """
     data = request.json
     input_path_str = data.get('input_dir')
@@ -363,13 +518,46 @@ def get_channels():
     if not data_source:
         return jsonify({'status': 'error', 'message': 'Data source not provided.'}), 400
 
+    key = (input_path_str, data_source)
+    with channel_requests_lock:
+        pending = channel_requests.get(key)
+        is_owner = pending is None
+        if is_owner:
+            pending = channel_requests[key] = {'done': threading.Event(), 'result': None}
+
+    if is_owner:
+        try:
+            pending['result'] = _detect_channels(input_path_str, data_source)
+        finally:
+            with channel_requests_lock:
+                del channel_requests[key]
+            pending['done'].set()
+    elif not pending['done'].wait(timeout=10) or pending['result'] is None:
+        # the first request is taking too long (or failed), do the work ourselves
+        pending = {'result': _detect_channels(input_path_str, data_source)}
+
+    payload, status_code = pending['result']
+    return jsonify(payload), status_code
+
+
+@functools.lru_cache(maxsize=256)
+def _read_edf_channels(path_str, mtime_ns, size):
+    """Reads the channel names from an EDF header. mtime/size are part of the cache key so edited files are re-read."""
+    import mne
+    return tuple(mne.io.read_raw_edf(path_str, preload=False, verbose=False).ch_names)
+
+
+def _detect_channels(input_path_str, data_source):
+    """Finds the first recording for the input and returns the channel payload and HTTP status code."""
     try:
         # Use utils.find_files to get a list of all EDFs.
         # It handles .txt files, directories, and single files recursively.
-        files_to_process, _ = utils.find_files(input_path_str)
+        # Only the first recording and whether there is more than one matter here; three files
+        # always span at least two recordings, so the walk can stop there.
+        files_to_process, _ = utils.find_files(input_path_str, max_files=3)
 
         if not files_to_process:
-            return jsonify({'status': 'error', 'message': f'No sleep recordings (.edf, .bdf) found for input: {input_path_str}'}), 404
+            return {'status': 'error', 'message': f'No sleep recordings (.edf, .bdf) found for input: {input_path_str}'}, 404
 
         first_file = files_to_process[0]
         scorer_type = 'psg' if data_source == TEXTS["DATA_SOURCE_PSG"] else 'forehead'
@@ -380,12 +568,12 @@ def get_channels():
         warning_hint = ""
 
         if scorer_type == 'forehead':
-            import re
+            # the scorer's own L/R pairing, so the GUI and the scoring run agree on the mode
+            from NIDRA.forehead_scorer import find_counterpart
             file_str = str(first_file)
-            # Check for L/R pair to determine if it's two-file ZMax
-            if re.search(r'(?i)[_ ]?L\.edf$', file_str):
-                r_file_str = re.sub(r'(?i)([_ ]?)L\.edf$', r'\1R.edf', file_str)
-                if Path(r_file_str).exists():
+            # Check for L/R pair to determine if it's two-file ZMax.
+            if file_str.lower().endswith('l.edf'):
+                if find_counterpart(first_file):
                     selection_mode = 'zmax_two_files'
                 else:  # It's an L file but no R file, treat as one file
                     selection_mode = 'zmax_one_file'
@@ -409,22 +597,22 @@ def get_channels():
         # For PSG or single-file ZMax, we need to read the channels from the first file.
         if selection_mode in ['psg', 'zmax_one_file']:
             try:
-                raw = mne.io.read_raw_edf(first_file, preload=False, verbose=False)
-                channels = raw.ch_names
+                st = os.stat(first_file)
+                channels = list(_read_edf_channels(str(first_file), st.st_mtime_ns, st.st_size))
             except Exception as e:
                 logger.error(f"Could not read channels from {first_file}: {e}", exc_info=True)
-                return jsonify({'status': 'error', 'message': f'Error reading file: {first_file.name}\n{e}'}), 500
+                return {'status': 'error', 'message': f'Error reading file: {first_file.name}\n{e}'}, 500
 
-        return jsonify({
+        return {
             'status': 'success',
             'channels': channels,
             'selection_mode': selection_mode,
             'dialog_text': dialog_text
-        })
+        }, 200
 
     except Exception as e:
         logger.error(f"Error determining channels: {e}", exc_info=True)
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        return {'status': 'error', 'message': str(e)}, 500
 
 
 @app.route('/log-channel-selection', methods=['POST'])
@@ -436,71 +624,165 @@ def log_channel_selection():
         logger.info(f"Manually selected channels: {', '.join(channels)}")
     return jsonify({'status': 'success'})
 
+# /status is polled continuously, so its few possible bodies are built once up front
+_STATUS_BODIES = {
+    (running, cancelling): f'{{"is_cancelling":{str(cancelling).lower()},"is_running":{str(running).lower()}}}\n'.encode()
+    for running in (False, True) for cancelling in (False, True)
+}
+
 @app.route('/status')
 def status():
-    return jsonify({'is_running': is_scoring_running, 'is_cancelling': is_cancelling})
+    return Response(_STATUS_BODIES[(STATE.scoring_running, STATE.cancelling)], mimetype='application/json')
 
 
 @app.route('/log')
 def log_stream():
+    offset = request.args.get('offset', type=int)
+    if offset is not None:
+        return _log_tail(offset)
     try:
         if not LOG_FILE.exists() or LOG_FILE.stat().st_size == 0:
             return TEXTS["CONSOLE_INIT_MESSAGE"]
-        with open(LOG_FILE, 'r', encoding='utf-8', errors='ignore') as f:
-            return f.read()
+        # stream the file in 8 KB chunks instead of building the whole log in memory
+        def generate():
+            with open(LOG_FILE, 'r', encoding='utf-8', errors='ignore') as f:
+                while True:
+                    chunk = f.read(8192)
+                    if not chunk:
+                        break
+                    yield chunk
+        return Response(generate(), mimetype='text/plain')
     except Exception as e:
         return f"Error reading log file: {e}"
 
 
-# heartbeat to ensure NIDRA is shutdown when tab is closed (ping disappears).
-def probe_frontend_loop():
+def _read_log_since(offset):
     """
-    Periodically probes the frontend to ensure it's still alive.
-    If the frontend is unresponsive for a grace period, the backend shuts down.
+    Reads the complete log lines written since `offset`. A partial last line (and any split UTF-8
+    sequence) is held back until the next read. If the log is shorter than `offset` it was
+    recreated, so reading starts over and `reset` is set.
     """
-    global last_frontend_contact
-    while True:
-        if frontend_url and last_frontend_contact:
+    size = LOG_FILE.stat().st_size if LOG_FILE.exists() else 0
+    reset = offset > size
+    if reset:
+        offset = 0
+    data = b''
+    if size > offset:
+        with open(LOG_FILE, 'rb') as f:
+            f.seek(offset)
+            data = f.read(size - offset)
+        data = data[:data.rfind(b'\n') + 1]
+    return {'offset': offset + len(data), 'data': data.decode('utf-8', errors='ignore'), 'reset': reset}
+
+
+def _log_tail(offset):
+    """
+    Returns the log bytes written since `offset` as JSON, so polling costs O(new output) instead of
+    O(log size). `reset` tells the client to replace its text rather than append.
+    """
+    try:
+        if not LOG_FILE.exists() or LOG_FILE.stat().st_size == 0:
+            return jsonify({'offset': 0, 'data': TEXTS["CONSOLE_INIT_MESSAGE"], 'reset': True})
+        update = _read_log_since(max(offset, 0))
+        update['reset'] = update['reset'] or offset <= 0  # first load replaces the init message
+        return jsonify(update)
+    except Exception as e:
+        return jsonify({'offset': 0, 'data': f"Error reading log file: {e}", 'reset': True})
+
+
+@app.route('/log-stream')
+def log_events():
+    """
+    Server-sent events with new log output from `offset` on, so an open page gets log lines pushed
+    over one connection instead of polling /log. Sends a keepalive comment when the log is quiet.
+    """
+    offset = request.args.get('offset', 0, type=int)
+    # waitress provides this check (the launcher enables its read-ahead, so a closed page is noticed
+    # while the stream runs); it is polled every 0.25 s, so a stale stream does not hold a server
+    # thread until its next write
+    client_disconnected = request.environ.get('waitress.client_disconnected', lambda: False)
+
+    def generate():
+        nonlocal offset
+        # sent straight away, so the headers go out and a connection that is already gone fails now
+        yield ": connected\n\n"
+        last_sent = time.monotonic()
+        while not client_disconnected():
+            # an open stream means the page is still there (its timers may be throttled in the background);
+            # once the page is gone, the disconnect check (or the next write) ends this loop
+            STATE.last_frontend_contact = time.monotonic()
             try:
-                # The frontend doesn't need to respond to this, we just need to see if the server is up.
-                requests.head(f"{frontend_url}/alive-ping", timeout=3)
-                last_frontend_contact = time.time()
-            except requests.exceptions.RequestException:
-                # If the probe fails, we don't update last_frontend_contact.
-                pass
-
-            if time.time() - last_frontend_contact > frontend_grace_period:
+                update = _read_log_since(offset)
+            except OSError:
+                update = {'data': '', 'reset': False}
+            now = time.monotonic()
+            if update['data'] or update['reset']:
+                offset = update['offset']
+                yield f"data: {json.dumps(update)}\n\n"
+                last_sent = now
+            elif now - last_sent > 15:
+                yield ": keepalive\n\n"
+                last_sent = now
+            time.sleep(0.25)
+
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+
+# heartbeat to ensure NIDRA is shutdown when tab is closed (requests from the page stop).
+# Every request from the page (and an open /log-stream) counts as contact; a timer checks for silence.
+@app.before_request
+def touch_frontend_contact():
+    # a single attribute store, so no lock is needed on this per-request path
+    STATE.last_frontend_contact = time.monotonic()
+
+def check_frontend_contact():
+    """
+    Shuts the backend down if the frontend has been silent for the grace period,
+    otherwise checks again when the grace period would next run out.
+    A running scoring job is never cut short: the exit waits until it has finished.
+    """
+    silent_for = time.monotonic() - STATE.last_frontend_contact
+    with STATE_LOCK:
+        if silent_for > frontend_grace_period:
+            if not STATE.scoring_running:
                 logger.warning(f"Frontend has been unresponsive for {frontend_grace_period} seconds. Shutting down backend.")
                 os._exit(0)
-
-        time.sleep(5)
-
-@app.route('/alive-ping')
+            # check again shortly; the frontend may come back, or the job finishes and the exit goes ahead
+            schedule_frontend_check(5)
+            return
+        schedule_frontend_check(frontend_grace_period - silent_for + 1)
+
+def schedule_frontend_check(delay):
+    """Arms the watchdog timer; the caller holds STATE_LOCK."""
+    STATE.frontend_watchdog = threading.Timer(delay, check_frontend_contact)
+    STATE.frontend_watchdog.daemon = True
+    STATE.frontend_watchdog.start()
+
+# the heartbeat and shutdown endpoints only need a status code, so they return empty 204 responses
+@app.route('/alive-ping', provide_automatic_options=False)
 def alive_ping():
-    return jsonify({'status': 'ok'})
+    return '', 204
 
-@app.route('/goodbye', methods=['POST'])
+@app.route('/goodbye', methods=['POST'], provide_automatic_options=False)
 def goodbye():
     logger.info("Received /goodbye signal from frontend. Shutting down.")
     threading.Thread(target=lambda: (time.sleep(1), os._exit(0))).start()
-    return jsonify({'status': 'ok'})
+    return '', 204
 
 @app.route('/register', methods=['POST'])
 def register_frontend():
     """
-    Receives the frontend's URL and starts the monitoring thread.
+    Receives the frontend's URL and starts the shutdown watchdog.
     """
-    global frontend_url, last_frontend_contact, probe_thread
     data = request.json
     url = data.get('url')
     if not url:
         return jsonify({'status': 'error', 'message': 'URL not provided'}), 400
 
-    frontend_url = url
-    last_frontend_contact = time.time()
-    if probe_thread is None:
-        probe_thread = threading.Thread(target=probe_frontend_loop, daemon=True)
-        probe_thread.start()
+    with STATE_LOCK:
+        STATE.frontend_url = url
+        if STATE.frontend_watchdog is None:
+            schedule_frontend_check(frontend_grace_period + 1)
 
     return jsonify({'status': 'success'})
 
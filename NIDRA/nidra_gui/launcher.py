@@ -1,56 +1,70 @@
 
-import time
 import os
 import socket
 import threading
-import webbrowser
-import multiprocessing
-from werkzeug.serving import make_server
-from NIDRA.nidra_gui import app as nidra_app
 
 
-def find_free_port(preferred_ports=[5001, 5002, 5003, 62345, 62346, 62347, 62348, 62349]):
+class ServerWrapper(threading.Thread):
     """
-    Finds a free port on the host machine.
-    It first tries a list of preferred ports and then falls back to a random port.
+    Serves the app in a background thread and can be stopped programmatically.
+    Uses waitress (a production WSGI server) when it is installed, otherwise the Werkzeug server.
     """
-    for port in preferred_ports:
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.bind(('', port))
-                return port
-        except OSError:
-            continue  # Port is already in use
-
-    # If no preferred ports are available, ask the OS for a random one
-    try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.bind(('', 0))
-            return s.getsockname()[1]
-    except Exception as e:
-        raise RuntimeError("Could not find any free port.") from e
-
-class ServerWrapper(threading.Thread):
-    """A Werkzeug server that can be stopped programmatically."""
-    def __init__(self, app, port):
+    def __init__(self, app, sock):
         super().__init__(daemon=True)
-        self.server = make_server('127.0.0.1', port, app, threaded=True)
+        # sock is already bound and listening, so the port is taken and connections queue up from the start
+        self.sock = sock
+        try:
+            from waitress import create_server
+        except ImportError:
+            create_server = None
+        if create_server:
+            # a read-ahead of one request lets waitress notice a client that went away mid-response,
+            # which the /log-stream loop checks through waitress.client_disconnected
+            self.server = create_server(app, sockets=[sock], threads=8, connection_limit=200,
+                                        channel_request_lookahead=1)
+            self.backend = "waitress"
+        else:
+            from werkzeug.serving import make_server
+            host, port = sock.getsockname()[:2]
+            self.server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+            self.backend = "werkzeug"
         self.ctx = app.app_context()
         self.ctx.push()
 
     def run(self):
-        print("Starting Flask server...")
-        self.server.serve_forever()
+        print(f"Starting Flask server ({self.backend})...")
+        if self.backend == "waitress":
+            self.server.run()
+        else:
+            self.server.serve_forever()
 
     def shutdown(self):
         print("Shutting down Flask server...")
-        self.server.shutdown()
+        if self.backend == "waitress":
+            # the serving loop runs until no channel is left, and the page keeps its /log-stream (and
+            # keep-alive connections) open, so close every channel, not just the listening socket.
+            # waitress has no public call for this; _map is its channel map (as of waitress 3.0),
+            # and if it ever goes away, shutdown falls back to the public close() + dispatcher shutdown
+            self.server.close()
+            for channel in list(getattr(self.server, '_map', {}).values()):
+                channel.close()
+            self.server.task_dispatcher.shutdown()
+        else:
+            self.server.shutdown()
 
 def main():
     """
     Starts the Flask server in a background thread and then launches the browser.
     """
-    multiprocessing.set_start_method('spawn', force=True)
+    # in a frozen bundle, a spawned scoring process re-enters here; let it run its task and stop
+    import multiprocessing
+    multiprocessing.freeze_support()
+
+    # imported here rather than at the top, so the scoring process (which re-imports this module
+    # when spawned) does not set up a second app, log file and scoring pool
+    from NIDRA.nidra_gui import app as nidra_app
+    # start the model download and warm up the scoring process while the server and browser come up
+    nidra_app.start_background_work()
 
     # One-shot silent Matplotlib font cache build to suppress FreeType emoji noise
     try:
@@ -65,31 +79,35 @@ def main():
         with open(os.devnull, 'w') as devnull, contextlib.redirect_stderr(devnull):
             import matplotlib
             matplotlib.use('Agg', force=True)
-            from matplotlib import font_manager
-            font_manager.FontManager()
+            # importing font_manager loads the cached font list and only scans the system fonts when
+            # the cache is missing; constructing FontManager() here would rescan them on every launch
+            from matplotlib import font_manager  # noqa: F401
         # restore levels
         mpl_logger.setLevel(prev_mpl_level)
         fm_logger.setLevel(prev_fm_level)
     except Exception:
         pass
 
-    # start the flask server in its own process
-    port = find_free_port()
-    server = ServerWrapper(nidra_app.app, port)
+    # bind the listening socket here and hand it to the server thread: the browser can connect as soon as
+    # it opens (requests queue in the backlog until the server loop runs), so no startup sleep is needed
+    # port 0 lets the OS pick a free port in one bind; SO_REUSEADDR is set on POSIX only
+    sock = socket.create_server(('127.0.0.1', 0), backlog=128)
+    port = sock.getsockname()[1]
+    server = ServerWrapper(nidra_app.app, sock)
     server.start()
 
     run_neutralino = False  # use browser by default, TODO: fix neutralino madness
 
     if not run_neutralino:
         # --- Browser-based GUI Logic ---
+        import webbrowser
         url = f"http://127.0.0.1:{port}"
-        time.sleep(1)
         webbrowser.open(url)
         try:
             server.join()
         except KeyboardInterrupt:
             server.shutdown()
-            server.join()
+            server.join(timeout=10)
     # else:
     #     if sys.platform == "win32":
     #         binary_name = "neutralino-win_x64.exe"
@@ -127,6 +145,7 @@ def main():
     #         server.shutdown()
     #         server.join()
 
+    nidra_app.stop_background_work()
     print("Server has shut down. Exiting.")
 
 if __name__ == '__main__':
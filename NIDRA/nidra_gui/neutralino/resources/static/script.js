@@ -181,10 +181,21 @@ function initializeApp() {
         }
     });
 
+    // Dialogs run in the background on the backend (202 + job id); poll until the user has chosen
+    const runDialog = async (url) => {
+        let response = await fetch(url);
+        let result = await response.json();
+        while (response.status === 202) {
+            await new Promise(resolve => setTimeout(resolve, 300));
+            response = await fetch(`/dialog-result/${result.job_id}`);
+            result = await response.json();
+        }
+        return { response, result };
+    };
+
     const handleBrowseFolder = async (targetInputId) => {
         try {
-            const response = await fetch('/select-directory');
-            const result = await response.json();
+            const { response, result } = await runDialog('/select-directory');
 
             if (response.ok && result.status === 'success') {
                 const path = result.path;
@@ -210,8 +221,7 @@ function initializeApp() {
 
     const handleBrowseFile = async () => {
         try {
-            const response = await fetch('/select-input-file');
-            const result = await response.json();
+            const { response, result } = await runDialog('/select-input-file');
 
             if (response.ok && result.status === 'success') {
                 const filePath = result.path;
@@ -318,20 +328,40 @@ function initializeApp() {
         clearInterval(statusInterval);
     }
 
+    // Byte offset into the log file; only output written since then is fetched.
+    let logOffset = 0;
+    let logFetchPending = false;
+
+    // Server-sent log stream; while it is open, no polling is needed.
+    let logSource = null;
+
+    function applyLogUpdate(result) {
+        const consolePre = consoleOutput.querySelector('pre');
+        if (result.reset) {
+            consolePre.textContent = result.data;
+        } else if (result.data) {
+            consolePre.textContent += result.data;
+        }
+        if (result.reset || result.data) {
+            // Auto-scroll to the bottom
+            consoleOutput.scrollTop = consoleOutput.scrollHeight;
+        }
+        logOffset = result.offset;
+    }
+
     async function fetchLogs() {
+        if (logFetchPending || logSource) return;
+        logFetchPending = true;
         try {
-            const response = await fetch('/log');
-            const logText = await response.text();
-            const consolePre = consoleOutput.querySelector('pre');
-            if (consolePre.textContent !== logText) {
-                consolePre.textContent = logText;
-                // Auto-scroll to the bottom
-                consoleOutput.scrollTop = consoleOutput.scrollHeight;
-            }
-            return logText;
+            const response = await fetch(`/log?offset=${logOffset}`);
+            const result = await response.json();
+            applyLogUpdate(result);
+            return result.data;
         } catch (error) {
             console.error('Error fetching logs:', error);
-            return ""; 
+            return "";
+        } finally {
+            logFetchPending = false;
         }
     }
 
@@ -354,10 +384,29 @@ function initializeApp() {
         }
     }
 
-    // Always poll logs while the UI is open
-    if (logInterval) clearInterval(logInterval);
-    logInterval = setInterval(fetchLogs, 1000);
-    fetchLogs();
+    function startLogPolling() {
+        if (logInterval) clearInterval(logInterval);
+        logInterval = setInterval(fetchLogs, 1000);
+    }
+
+    // Follow the log via server-sent events, falling back to polling if they are unavailable
+    function startLogStream() {
+        if (!window.EventSource) {
+            startLogPolling();
+            return;
+        }
+        logSource = new EventSource(`/log-stream?offset=${logOffset}`);
+        logSource.onmessage = (event) => applyLogUpdate(JSON.parse(event.data));
+        logSource.onerror = () => {
+            // Don't let the browser reconnect from the stale offset; poll from the current one instead
+            logSource.close();
+            logSource = null;
+            startLogPolling();
+        };
+    }
+
+    // Load the log so far, then follow it while the UI is open
+    fetchLogs().then(startLogStream);
 
     checkStatus();
 
@@ -1,9 +1,9 @@
 import re
+import functools
 import mne
 import numpy as np
-import onnxruntime as ort
 import logging
-from scipy.signal import resample_poly
+from scipy.signal import resample_poly, firwin
 from pathlib import Path
 from collections import namedtuple, OrderedDict
 from itertools import product
@@ -11,6 +11,42 @@ from typing import List, Tuple, Dict, Any
 from NIDRA.plotting import plot_hypnodensity
 from NIDRA import utils
 
+# channel name patterns used by PSGScorer._parse_channel, compiled once
+PREFIX_RE = re.compile(r'^(EEG|EOG|EMG)\s', re.IGNORECASE)
+MASTOID_REF_RE = re.compile(r'[:\-]?(A1|A2|M1|M2)$', re.IGNORECASE)
+EOG_RE = re.compile(r'EOG|LOC|ROC|E1|E2')  # matched against the upper-cased name
+
+# model class index -> output sleep stage (the model's REM class 4 is reported as stage 5)
+STAGE_LUT = np.array([0, 1, 2, 3, 5, 5, 6])
+
+def _quartiles(x):
+    """
+    Returns the 25th, 50th and 75th percentiles of x along axis 0 (linear interpolation, like np.percentile)
+    from a single np.partition, instead of one sort/select per statistic.
+    """
+    if np.isnan(x).any():
+        # partition would order NaNs last and return them as quantiles; the nan-aware path skips them
+        return np.nanpercentile(x, [25, 50, 75], axis=0).astype(x.dtype, copy=False)
+    n = x.shape[0]
+    pos = np.array([0.25, 0.5, 0.75]) * (n - 1)
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.minimum(lo + 1, n - 1)
+    part = np.partition(x, np.union1d(lo, hi), axis=0)
+    frac = (pos - lo).astype(x.dtype).reshape((3,) + (1,) * (x.ndim - 1))
+    return part[lo] + (part[hi] - part[lo]) * frac
+
+@functools.lru_cache(maxsize=None)
+def _resample_filter(up, down):
+    """
+    Builds the anti-aliasing FIR that resample_poly would design for up/down (same cutoff, length and
+    kaiser window), once per rate pair instead of on every call.
+    """
+    max_rate = max(up, down) // np.gcd(up, down)
+    if max_rate == 1:
+        # equal rates: resample_poly only copies, so keep its default (unused) window
+        return ('kaiser', 5.0)
+    return firwin(2 * 10 * max_rate + 1, 1.0 / max_rate, window=('kaiser', 5.0)).astype(np.float32)
+
 class PSGScorer:
     def __init__(self, input = None, output: str = None, channels: list = None, 
                  sfreq: float = None, model: str = "u-sleep-nsrr-2024",
@@ -26,10 +62,10 @@ class PSGScorer:
             if input is None:
                 raise ValueError("No valid input provided")
             if isinstance(input, (str, Path)) and input.is_dir():
-                try:
-                    self.input = next(input.glob('*.edf'))
-                except StopIteration:
-                    raise FileNotFoundError(f"Could not find an EDF file in directory '{input}'.")   
+                edf_files = utils.list_edfs(input)
+                if not edf_files:
+                    raise FileNotFoundError(f"Could not find an EDF file in directory '{input}'.")
+                self.input = edf_files[0]
             elif isinstance(input, (str, Path)) and input.is_file():
                 self.input = input
             else:
@@ -102,7 +138,7 @@ class PSGScorer:
         
         model_path = utils.get_model_path(model_filename)
         try:
-            self.session = ort.InferenceSession(model_path)
+            self.session = utils.load_onnx_session(model_path)
             self.input_name = self.session.get_inputs()[0].name
             self.output_name = self.session.get_outputs()[0].name
             print(f"Model loaded: '{model_path}'")
@@ -132,34 +168,33 @@ class PSGScorer:
         print(f"Found {len(self.channel_groups)} channel groups.")
 
         self.raw.pick(channels_to_load)
-        self.raw.load_data()
-            
+        # no load_data(): get_data reads the picked channels straight from the file, instead of first
+        # keeping a full float64 copy of them in raw (the plot also reads its channels on demand)
         original_sample_rate = self.raw.info['sfreq']
-        psg_data = self.raw.get_data().T.astype(np.float64)
+        # float32 throughout: it is what the model takes, and it halves the memory traffic of resampling
+        psg_data = self.raw.get_data().T.astype(np.float32)
 
         n_samples_in_epoch_original = int(self.epoch_sec * original_sample_rate)
         n_epochs = len(psg_data) // n_samples_in_epoch_original
         psg_data = psg_data[:n_epochs * n_samples_in_epoch_original]
 
-        # clip noisy values
-        for i in range(psg_data.shape[1]):
-            channel_data = psg_data[:, i]
-            iqr = np.nanpercentile(channel_data, 75) - np.nanpercentile(channel_data, 25)
-            threshold = 20 * iqr
-            psg_data[:, i] = np.clip(channel_data, -threshold, threshold)
+        # clip noisy values (per-channel thresholds, all channels in one pass)
+        q25, _, q75 = _quartiles(psg_data)
+        threshold = 20 * (q75 - q25)
+        np.clip(psg_data, -threshold, threshold, out=psg_data)
 
-        psg_data_resampled = resample_poly(psg_data, target_sf, int(original_sample_rate), axis=0)
+        psg_data_resampled = resample_poly(psg_data, target_sf, int(original_sample_rate), axis=0,
+                                           window=_resample_filter(target_sf, int(original_sample_rate)))
 
-        # scale data
-        psg_data_scaled = np.empty_like(psg_data_resampled, dtype=np.float64)
-        for i in range(psg_data_resampled.shape[1]):
-            psg_data_scaled[:, i] = self._robust_scale_channel(psg_data_resampled[:, i])
+        # scale data (per channel, all channels at once and in place)
+        psg_data_scaled = self._robust_scale(psg_data_resampled)
         
         n_samples_in_epoch_final = self.epoch_sec * target_sf
         n_epochs_final = len(psg_data_scaled) // n_samples_in_epoch_final
         psg_data_scaled = psg_data_scaled[:n_epochs_final * n_samples_in_epoch_final]
         
-        self.preprocessed_psg = psg_data_scaled.reshape(n_epochs_final, n_samples_in_epoch_final, -1).astype(np.float32)
+        # the pipeline already works in float32, so this is a no-op cast rather than a full copy
+        self.preprocessed_psg = psg_data_scaled.reshape(n_epochs_final, n_samples_in_epoch_final, -1).astype(np.float32, copy=False)
     
     # alternative predict function that uses overlapping windows.
     # this might have higher accuracy, but does not align well with the original sleepyland/usleep implementation
@@ -231,65 +266,83 @@ class PSGScorer:
 
     def _predict(self):
         print(f"Prediction started.")
-        window_size = int(self.session.get_inputs()[0].shape[1])      # L (epochs per window; fixed to 35)
+        model_input = self.session.get_inputs()[0]
+        window_size = int(model_input.shape[1])                       # L (epochs per window; fixed to 35)
         n_epochs_total = int(self.preprocessed_psg.shape[0])          # N (total epochs)
         samples_per_epoch = int(self.preprocessed_psg.shape[1])       # S
         n_classes = int(self.session.get_outputs()[0].shape[-1])      # C_out
-        batch_size = 64
+        # several windows per model call when the model's batch dimension is dynamic (one otherwise);
+        # kept small, since the model's activation memory grows with the batch
+        batch_size = 8 if not isinstance(model_input.shape[0], int) else 1
         margin = window_size // 2
-        group_probabilities = []
+        # the groups' predictions are summed in place and averaged once at the end,
+        # instead of keeping every group's [N, C] result around for a stack + mean
+        prob_sum = np.zeros((n_epochs_total, n_classes), dtype=np.float32)  # [N, C]
+
+        # --- Non-overlapping windows (Old Method) ---
+        # (start, keep): the window covers epochs [start, start + L) and contributes from start + keep on.
+        # A partial final window is taken as the last L epochs and only contributes the remaining epochs.
+        windows = []
+        if n_epochs_total > window_size:
+            windows = [(s, 0) for s in range(0, n_epochs_total - window_size + 1, window_size)]
+            remaining = n_epochs_total % window_size
+            if remaining:
+                windows.append((n_epochs_total - window_size, window_size - remaining))
+        n_batch = min(batch_size, max(len(windows), 1))
+
+        # input/output buffers and their binding are set up once and reused by every channel group,
+        # so onnxruntime does not wrap the input and allocate a new output for every batch
+        in_buf = None  # [B, L, S, C], allocated for the first group's channel count
+        out_buf = np.empty((n_batch, window_size, n_classes), dtype=np.float32)  # [B, L, C_out]
+        io_binding = self.session.io_binding()
+
+        def bind(b):
+            # binds the first b windows of the buffers; only a smaller final batch needs a rebind
+            io_binding.bind_input(name=self.input_name, device_type='cpu', device_id=0, element_type=np.float32,
+                                  shape=(b,) + in_buf.shape[1:], buffer_ptr=in_buf.ctypes.data)
+            io_binding.bind_output(name=self.output_name, device_type='cpu', device_id=0, element_type=np.float32,
+                                   shape=(b,) + out_buf.shape[1:], buffer_ptr=out_buf.ctypes.data)
+
+        def run_batch(batch_windows):
+            for j, window in enumerate(batch_windows):
+                np.copyto(in_buf[j, :len(window)], window)
+                in_buf[j, len(window):] = 0  # zero-pads a recording shorter than one window
+            if len(batch_windows) != n_batch:
+                bind(len(batch_windows))
+            self.session.run_with_iobinding(io_binding)
+            return out_buf[:len(batch_windows)]  # [b, L, C]; overwritten by the next batch
 
         for i, channel_group in enumerate(self.channel_groups):
             
             self.logger.info(f"Predicting on group {i+1}/{len(self.channel_groups)}: {channel_group.channel_names}")
 
             # [N, S, C_in]
-            psg_subset = self.preprocessed_psg[:, :, tuple(channel_group.channel_indices)].astype(np.float32)
+            psg_subset = self.preprocessed_psg[:, :, channel_group.channel_indices]  # a view for adjacent channels
             n_channels = psg_subset.shape[-1]
+            if in_buf is None or in_buf.shape[-1] != n_channels:
+                in_buf = np.empty((n_batch, window_size, samples_per_epoch, n_channels), dtype=np.float32)
 
-            # --- Non-overlapping windows (Old Method) ---
+            bind(n_batch)
             if n_epochs_total <= window_size:
-                diff = window_size - n_epochs_total
-                pad = np.zeros((diff, samples_per_epoch, n_channels), dtype=np.float32) if diff > 0 else None
-                window = psg_subset if diff == 0 else np.concatenate([psg_subset, pad], axis=0)
-                batch = np.expand_dims(window, 0)  # [1, L, S, C]
-                pred = self.session.run([self.output_name], {self.input_name: batch})[0][0]  # [L, C]
-                group_probs = pred[:n_epochs_total]
+                prob_sum += run_batch([psg_subset])[0][:n_epochs_total]
             else:
-                preds = []
-                # Calculate starts for non-overlapping windows
-                starts = range(0, n_epochs_total, window_size)
-                
-                for s in starts:
-                    e = s + window_size
-                    if e <= n_epochs_total:
-                        # Full window
-                        window = psg_subset[s:e]
-                        batch = np.expand_dims(window, 0)
-                        pred_batch = self.session.run([self.output_name], {self.input_name: batch})[0][0]
-                        preds.append(pred_batch)
-                    else:
-                        # Partial final window - grab last window_size epochs
-                        last_window = psg_subset[-window_size:]
-                        batch = np.expand_dims(last_window, 0)
-                        pred_batch = self.session.run([self.output_name], {self.input_name: batch})[0][0]
-                        # Only take the part that corresponds to the remaining epochs
-                        remaining = n_epochs_total - s
-                        preds.append(pred_batch[-remaining:])
-                
-                group_probs = np.concatenate(preds, axis=0)
-
-            group_probabilities.append(group_probs)
-
-        # Ensemble average across channel groups
-        self.probabilities = np.mean(np.stack(group_probabilities, axis=0), axis=0)  # [N, C]
+                for b in range(0, len(windows), n_batch):
+                    batch_windows = windows[b:b + n_batch]
+                    preds = run_batch([psg_subset[s:s + window_size] for s, _ in batch_windows])
+                    for (s, keep), pred in zip(batch_windows, preds):
+                        prob_sum[s + keep:s + window_size] += pred[keep:]
+
+        # Ensemble average across channel groups (the model's outputs are already softmax probabilities,
+        # so the average needs no further normalisation, and argmax needs none at all)
+        prob_sum /= len(self.channel_groups)
+        self.probabilities = prob_sum  # [N, C]
         self.sleep_stages = self.probabilities.argmax(-1)
         print(f"Prediction successful.")
         return self.sleep_stages, self.probabilities
 
     def _postprocess(self):
-        # Remap stages: 4 -> 5 (REM)
-        self.sleep_stages[self.sleep_stages == 4] = 5
+        # Remap stages: 4 -> 5 (REM), as a single lookup
+        self.sleep_stages = STAGE_LUT[self.sleep_stages]
 
 
     def _save_results(self):
@@ -298,8 +351,7 @@ class PSGScorer:
             hypnogram_path = self.output / f"{self.base_filename}_hypnogram.csv"
             with open(hypnogram_path, 'w') as f:
                 f.write("sleep_stage\n")
-                for stage in self.sleep_stages:
-                    f.write(f"{int(stage)}\n")
+                np.savetxt(f, self.sleep_stages, fmt="%d")
             print(f"Sleep stages saved to: '{hypnogram_path}'")
 
         if self.hypnodensity:
@@ -307,9 +359,10 @@ class PSGScorer:
             with open(hypnodensity_path, 'w') as f:
                 header = "Epoch,Wake,N1,N2,N3,REM,Art\n"
                 f.write(header)
-                for i, probs in enumerate(self.probabilities):
-                    prob_str = ",".join(f"{p:.6f}" for p in probs)
-                    f.write(f"{i},{prob_str},0.000000\n")
+                # epoch index, class probabilities and an all-zero artefact column, formatted in one call
+                n_epochs, n_classes = self.probabilities.shape
+                rows = np.column_stack([np.arange(n_epochs), self.probabilities, np.zeros(n_epochs)])
+                np.savetxt(f, rows, delimiter=",", fmt=["%d"] + ["%.6f"] * (n_classes + 1))
             print(f"Classifier probabilities (hypnodensity) saved to: '{hypnodensity_path}'")
 
     def _make_plot(self):
@@ -337,16 +390,14 @@ class PSGScorer:
         EEG_BASES     = {'FP1', 'FP2', 'F3', 'F4', 'C3', 'C4', 'P3', 'P4', 
                         'O1', 'O2', 'F7', 'F8', 'T3', 'T4', 'T5', 'T6', 'FZ', 
                         'CZ', 'PZ', 'F1', 'F2'}
-        EOG_PATTERNS  = {'EOG', 'LOC', 'ROC', 'E1', 'E2'}
-        EOG_BASES     = ('EOG', 'OC', 'E1', 'E2')
         OTHER_NON_EEG = {'EMG', 'ECG', 'EKG'}
 
         # TODO: one line?
         name_stripped = name.strip()
         upper = name_stripped.upper()
         
-        prefix_stripped = re.sub(r'^(EEG|EOG|EMG)\s', '', name_stripped, flags=re.IGNORECASE)
-        base, subs = re.subn(r'[:\-]?(A1|A2|M1|M2)$', '', prefix_stripped, flags=re.IGNORECASE)
+        prefix_stripped = PREFIX_RE.sub('', name_stripped)
+        base, subs = MASTOID_REF_RE.subn('', prefix_stripped)
         base = base.strip().upper()
         base = upper if upper in MASTOIDS else base
 
@@ -354,7 +405,7 @@ class PSGScorer:
         ch_type = 'OTHER'
 
         # Classify based on unambiguous patterns. Selection logic will handle fallbacks.
-        if any(p in search_name for p in EOG_PATTERNS):
+        if EOG_RE.search(search_name):
             ch_type = 'EOG'
         elif base in EEG_BASES or ('EEG' in search_name and not any(o in search_name for o in OTHER_NON_EEG)):
             ch_type = 'EEG'
@@ -446,22 +497,23 @@ class PSGScorer:
             return [], [], eog_detected
 
         all_to_load = list(OrderedDict.fromkeys(ch for group in channel_groups for ch in group))
-        final_groups = [
-            ChannelSet(list(group), [all_to_load.index(ch) for ch in group])
-            for group in channel_groups
-        ]
+
+        def channel_index(group):
+            # adjacent channels become a slice, so indexing the data with it gives a view instead of a copy
+            indices = [all_to_load.index(ch) for ch in group]
+            if indices == list(range(indices[0], indices[0] + len(indices))):
+                return slice(indices[0], indices[0] + len(indices))
+            return np.asarray(indices, dtype=np.intp)
+
+        final_groups = [ChannelSet(list(group), channel_index(group)) for group in channel_groups]
 
         return all_to_load, final_groups, eog_detected
 
-    def _robust_scale_channel(self,x):
-        median = np.nanmedian(x, axis=0, keepdims=True)
-        q25 = np.nanpercentile(x, 25, axis=0, keepdims=True)
-        q75 = np.nanpercentile(x, 75, axis=0, keepdims=True)
+    def _robust_scale(self, x):
+        """Robust-scales each column of x in place, by its median and IQR."""
+        q25, median, q75 = _quartiles(x)
         iqr = q75 - q25
         iqr[iqr == 0] = 1.0
-        return (x - median) / iqr
-
-    def _softmax(self, x: np.ndarray, axis: int = -1) -> np.ndarray:
-        """NumPy implementation of softmax"""
-        exp_x = np.exp(x - np.max(x, axis=axis, keepdims=True))
-        return exp_x / np.sum(exp_x, axis=axis, keepdims=True)
+        x -= median
+        x /= iqr
+        return x
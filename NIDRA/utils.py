@@ -3,22 +3,32 @@ import sys
 import logging
 import time
 import tempfile
+import functools
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from huggingface_hub import hf_hub_download
-from appdirs import user_data_dir
 import importlib.util
 from types import SimpleNamespace
 
 logger = logging.getLogger(__name__)
 
-def find_files(input):
+# shared pool for scanning sibling folders in parallel (directory listing is I/O-bound)
+_scan_executor = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 4), thread_name_prefix="nidra-scan")
+
+def find_files(input, max_files=None):
+    """
+    Collects the recordings for an input (file, directory or .txt list). Directories are walked
+    breadth-first without following directory symlinks; with max_files set (channel detection),
+    hidden folders are skipped and the walk stops once that many files have been found.
+    """
 
     input = Path(input)
     exts = {".edf", ".bdf"}
     skip_exact = {"BATT", "LIGHT", "DY", "BODY TEMP", "NOISE", "DX", "DZ"}
     skip_prefixes = ("OXY",)
     files = []
+    # channel detection only needs the first recordings, so it does not look inside hidden folders
+    skip_hidden = max_files is not None
 
     def should_skip_file(f: Path):
         name = f.stem.upper()
@@ -26,10 +36,44 @@ def find_files(input):
             return True
         return any(name.startswith(prefix) for prefix in skip_prefixes)
 
+    def scan_dir(d: Path):
+        try:
+            with os.scandir(d) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            return [], []
+        found, subdirs = [], []
+        for entry in entries:
+            # a symlinked directory is not descended into (like rglob), so a link back to an
+            # ancestor cannot loop; broken or unreadable entries are skipped
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not (skip_hidden and entry.name.startswith(".")):
+                        subdirs.append(Path(entry.path))
+                    continue
+                is_file = entry.is_file()
+            except OSError:
+                continue
+            if is_file:
+                f = Path(entry.path)
+                if f.suffix.lower() in exts and not should_skip_file(f):
+                    found.append(f)
+        return found, subdirs
+
     def collect_from_dir(d: Path):
-        for f in d.rglob("*"):
-            if f.is_file() and f.suffix.lower() in exts and not should_skip_file(f):
-                files.append(f)
+        # breadth-first walk with os.scandir (cached is_dir/is_file).
+        # all folders of one level are scanned in parallel; results are consumed in order, and a
+        # whole directory is always collected before stopping, so L/R pairs stay together.
+        level = [d]
+        while level:
+            results = _scan_executor.map(scan_dir, level) if len(level) > 1 else [scan_dir(level[0])]
+            next_level = []
+            for found, subdirs in results:
+                files.extend(found)
+                if max_files is not None and len(files) >= max_files:
+                    return
+                next_level.extend(subdirs)
+            level = next_level
 
     def collect_from_txt(txt: Path):
         with open(txt, "r") as f:
@@ -68,6 +112,11 @@ def find_files(input):
 
     return files_to_process, output_base
 
+def list_edfs(directory):
+    """Lists the EDF files in a directory (any extension case), sorted, using a single directory scan."""
+    with os.scandir(directory) as entries:
+        return sorted(Path(e.path) for e in entries if e.is_file() and e.name.lower().endswith(".edf"))
+
 def batch_scorer(input, output=None, type=None, model=None, channels=None, hypnogram=None, 
                  hypnodensity=False, plot=False, cancel_event=None, sfreq=None):
 
@@ -106,7 +155,7 @@ def batch_scorer(input, output=None, type=None, model=None, channels=None, hypno
         output_dir = None
 
     def score():
-        batch_start = time.time()
+        batch_start = time.monotonic()
         hypno = None
         probs = None
         success_count = 0
@@ -131,7 +180,7 @@ def batch_scorer(input, output=None, type=None, model=None, channels=None, hypno
                 logger.error(f"Unable to make output folder at {output_dir}, please specify a location where you have user rights.")
 
             try:
-                start = time.time()
+                start = time.monotonic()
 
                 if type == 'forehead':
                     from NIDRA.forehead_scorer import ForeheadScorer as Scorer
@@ -164,7 +213,7 @@ def batch_scorer(input, output=None, type=None, model=None, channels=None, hypno
 
                 hypno, probs = scorer.score()
 
-                dt = time.time() - start
+                dt = time.monotonic() - start
                 logger.info(f">> SUCCESS: Finished scoring {target_path.name} in {dt:.2f} seconds.")
                 logger.info(f"   Results saved to: {output_dir}")
                 logger.info("-" * 80)
@@ -173,7 +222,7 @@ def batch_scorer(input, output=None, type=None, model=None, channels=None, hypno
             except Exception as e:
                 logger.error(f">> FAILED to score {target_path}: {e}", exc_info=True)
 
-        total_dt = time.time() - batch_start
+        total_dt = time.monotonic() - batch_start
         logger.info("\n" + "="*80)
         logger.info("PROCESSING COMPLETE")
         logger.info(f"{success_count} of {total} recording(s) processed successfully.")
@@ -191,64 +240,68 @@ def calculate_font_size(screen_height, percentage, min_size, max_size):
     return max(min_size, min(font_size, max_size))
 
 def compute_sleep_stats(sleep_stages, epoch_duration_secs=30):
+    import numpy as np
+    stages = np.asarray(sleep_stages)
+    # stage codes are 0-6 (6 = artefact); anything else (e.g. -1 for unscored, NaN, 2.5) matches no
+    # stage, as with per-stage comparisons, and becomes -1 here so bincount accepts it
+    valid = (stages >= 0) & (stages <= 6) & (stages == np.floor(stages))
+    stages = np.where(valid, stages, -1).astype(np.intp)
     stats = {}
-    total_epochs = len(sleep_stages)
-
-    stats['Time in Bed (minutes)'] = (total_epochs * epoch_duration_secs) / 60
-
-    time_in_wake_mins = sleep_stages.count(0) * epoch_duration_secs / 60
-    time_in_n1_mins = sleep_stages.count(1) * epoch_duration_secs / 60
-    time_in_n2_mins = sleep_stages.count(2) * epoch_duration_secs / 60
-    time_in_n3_mins = sleep_stages.count(3) * epoch_duration_secs / 60
-    time_in_rem_mins = sleep_stages.count(5) * epoch_duration_secs / 60
-
-    stats['Time in Wake (minutes)'] = time_in_wake_mins
-    stats['Time in N1 (minutes)'] = time_in_n1_mins
-    stats['Time in N2 (minutes)'] = time_in_n2_mins
-    stats['Time in N3 (minutes)'] = time_in_n3_mins
-    stats['Time in REM (minutes)'] = time_in_rem_mins
+    total_epochs = len(stages)
+
+    # values are rounded to 2 decimals as they are stored; the unrounded ones feed the derived stats
+    time_in_bed_mins = (total_epochs * epoch_duration_secs) / 60
+    stats['Time in Bed (minutes)'] = round(time_in_bed_mins, 2)
+
+    # epochs per stage (0-6, 6 = artefact) in a single pass
+    counts = np.bincount(stages[valid], minlength=7).tolist()
+    time_in_wake_mins = counts[0] * epoch_duration_secs / 60
+    time_in_n1_mins = counts[1] * epoch_duration_secs / 60
+    time_in_n2_mins = counts[2] * epoch_duration_secs / 60
+    time_in_n3_mins = counts[3] * epoch_duration_secs / 60
+    time_in_rem_mins = counts[5] * epoch_duration_secs / 60
+
+    stats['Time in Wake (minutes)'] = round(time_in_wake_mins, 2)
+    stats['Time in N1 (minutes)'] = round(time_in_n1_mins, 2)
+    stats['Time in N2 (minutes)'] = round(time_in_n2_mins, 2)
+    stats['Time in N3 (minutes)'] = round(time_in_n3_mins, 2)
+    stats['Time in REM (minutes)'] = round(time_in_rem_mins, 2)
 
     total_sleep_time_mins = (time_in_n1_mins + time_in_n2_mins + 
                              time_in_n3_mins + time_in_rem_mins)
-    stats['Total Sleep Time (minutes)'] = total_sleep_time_mins
+    stats['Total Sleep Time (minutes)'] = round(total_sleep_time_mins, 2)
 
-    if stats['Time in Bed (minutes)'] > 0:
-        stats['Sleep Efficiency (%)'] = (total_sleep_time_mins / stats['Time in Bed (minutes)']) * 100
+    if time_in_bed_mins > 0:
+        stats['Sleep Efficiency (%)'] = round((total_sleep_time_mins / time_in_bed_mins) * 100, 2)
     else:
         stats['Sleep Efficiency (%)'] = 0
 
-    sleep_onset_epoch = -1
-    for i, stage in enumerate(sleep_stages):
-        if stage in [1, 2, 3, 4, 5]: 
-            sleep_onset_epoch = i
-            break
-    
+    # first epoch in any sleep stage (1-5)
+    asleep = (stages >= 1) & (stages <= 5)
+    sleep_onset_epoch = int(asleep.argmax()) if asleep.any() else -1
+
     if sleep_onset_epoch != -1:
-        stats['Sleep Latency (minutes)'] = (sleep_onset_epoch * epoch_duration_secs) / 60
+        stats['Sleep Latency (minutes)'] = round((sleep_onset_epoch * epoch_duration_secs) / 60, 2)
     else:
         stats['Sleep Latency (minutes)'] = 0 # Never fell asleep
 
     if sleep_onset_epoch != -1:
-        waso_epochs = sleep_stages[sleep_onset_epoch:].count(0)
-        stats['WASO (minutes)'] = (waso_epochs * epoch_duration_secs) / 60
+        waso_epochs = int(np.count_nonzero(stages[sleep_onset_epoch:] == 0))
+        stats['WASO (minutes)'] = round((waso_epochs * epoch_duration_secs) / 60, 2)
     else:
         stats['WASO (minutes)'] = 0
 
     if total_sleep_time_mins > 0:
-        stats['N1 Sleep (%)'] = (time_in_n1_mins / total_sleep_time_mins) * 100
-        stats['N2 Sleep (%)'] = (time_in_n2_mins / total_sleep_time_mins) * 100
-        stats['N3 Sleep (Deep Sleep) (%)'] = (time_in_n3_mins / total_sleep_time_mins) * 100
-        stats['REM Sleep (%)'] = (time_in_rem_mins / total_sleep_time_mins) * 100
+        stats['N1 Sleep (%)'] = round((time_in_n1_mins / total_sleep_time_mins) * 100, 2)
+        stats['N2 Sleep (%)'] = round((time_in_n2_mins / total_sleep_time_mins) * 100, 2)
+        stats['N3 Sleep (Deep Sleep) (%)'] = round((time_in_n3_mins / total_sleep_time_mins) * 100, 2)
+        stats['REM Sleep (%)'] = round((time_in_rem_mins / total_sleep_time_mins) * 100, 2)
     else:
         stats['N1 Sleep (%)'] = 0
         stats['N2 Sleep (%)'] = 0
         stats['N3 Sleep (Deep Sleep) (%)'] = 0
         stats['REM Sleep (%)'] = 0
 
-    for key, value in stats.items():
-        if isinstance(value, float):
-            stats[key] = round(value, 2)
-
     return stats
 
 # def select_channels(psg_data: np.ndarray, sample_rate: int, channel_names: List[str] = None) -> List[int]:
@@ -425,7 +478,8 @@ def setup_logging():
     log_file = log_dir / f"nidra_session_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
 
     # Open the file stream with line buffering (buffering=1)
-    log_file_stream = open(log_file, 'w', encoding='utf-8', buffering=1)
+    # Append mode, so lines written by the scoring process (see init_scoring_worker) are never overwritten
+    log_file_stream = open(log_file, 'a', encoding='utf-8', buffering=1)
     
     # Register a cleanup function to close the stream on exit
     import atexit
@@ -455,13 +509,70 @@ def setup_logging():
     # Return the configured root logger instance
     return log_file, logging.getLogger()
 
-def get_model_path(model_name=None):
+def init_scoring_worker(log_file, cancel_event):
+    """
+    Initializer for the GUI's scoring process: logs to the session log file (the GUI shows it)
+    and keeps the cancel event shared with the GUI process.
+    """
+    global _worker_cancel_event
+    _worker_cancel_event = cancel_event
+    handlers = [logging.FileHandler(log_file, mode='a', encoding='utf-8')]
+    if sys.stdout:
+        handlers.append(logging.StreamHandler(sys.stdout))
+    logging.basicConfig(level=logging.INFO, format='%(message)s', handlers=handlers, force=True)
+
+    # exit together with the GUI process, which may end via os._exit without shutting the pool down
+    import multiprocessing, threading
+    parent = multiprocessing.parent_process()
+    if parent is not None:
+        def exit_with_parent():
+            parent.join()
+            os._exit(0)
+        threading.Thread(target=exit_with_parent, daemon=True).start()
+
+def preload_scorers():
+    """Imports the scorers (mne, onnxruntime, ...) so the first scoring job does not pay the import time."""
+    import onnxruntime  # noqa: F401
+    from NIDRA import psg_scorer, forehead_scorer  # noqa: F401
+
+def run_scoring_job(**kwargs):
+    """Runs one batch scoring job in the scoring process, see init_scoring_worker."""
+    batch_scorer(cancel_event=_worker_cancel_event, **kwargs).score()
+
+_worker_cancel_event = None
+
+@functools.lru_cache(maxsize=None)
+def _models_dir():
+    # fixed for the life of the process (bundle dir or the user data dir), so it is resolved once
+    from appdirs import user_data_dir
     app_dir, is_bundle = get_app_dir()
     base_path = Path(app_dir) if is_bundle else Path(user_data_dir())
-    models_dir = base_path / "NIDRA" / "models"
+    return base_path / "NIDRA" / "models"
+
+def get_model_path(model_name=None):
+    models_dir = _models_dir()
     return models_dir / model_name if model_name else models_dir
 
+@functools.lru_cache(maxsize=2)
+def load_onnx_session(model_path):
+    """
+    Loads an ONNX model into an inference session. Sessions are cached, so
+    all recordings in a batch share one loaded model instead of reloading it per file.
+    """
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    # one model call at a time, so no inter-op pool; intra-op threads stay at ORT's default (physical cores)
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.inter_op_num_threads = 1
+    # name the providers explicitly: GPU builds refuse to guess, and this skips probing the others
+    available = ort.get_available_providers()
+    providers = [p for p in ("CUDAExecutionProvider", "CPUExecutionProvider") if p in available]
+    return ort.InferenceSession(str(model_path), sess_options=options, providers=providers)
+
+@functools.lru_cache(maxsize=None)
 def get_app_dir():
+    # the result cannot change while running, so it is resolved once (path resolution and stats)
     # PyInstaller bundle (one-dir)
     if getattr(sys, 'frozen', False):
         exe_dir = Path(sys.executable).resolve().parent
@@ -497,38 +608,52 @@ def download_assets(kind, logger):
         size_info = "(152 MB)"
     elif kind == "example_data":
         files = ["EEG_L.edf", "EEG_R.edf"]
-        model_dir = Path(os.path.dirname(get_model_path("dummy.onnx")))
-        base_dir = model_dir.parent / "example_zmax_data"
+        base_dir = get_model_path().parent / "example_zmax_data"
         size_info = "(24 MB)"
 
     base_dir.mkdir(parents=True, exist_ok=True)
 
+    # one directory listing instead of an exists() call per file. hf_hub_download only moves a file
+    # into place once it is complete, so a file that is present is a finished download (or one the
+    # user put there by hand)
+    present = {entry.name for entry in os.scandir(base_dir) if entry.is_file()}
+
     # Check existing
-    missing = [f for f in files if not (base_dir / f).exists()]
+    missing = [f for f in files if f not in present]
     if not missing:
         logger.info(f"All {kind.replace('_', ' ')} found in: {base_dir}")
         return str(base_dir)
 
-    # Download missing items
+    # imported only when something is missing: huggingface_hub pulls in httpx, filelock etc.
+    from huggingface_hub import hf_hub_download
+
+    # Download missing items in parallel (network-bound, so the downloads overlap instead of queueing)
     logger.info(f"Downloading {kind.replace('_', ' ')} to {base_dir}, please wait... {size_info}")
-    for name in missing:
-        try:
-            hf_hub_download(repo_id=repo_id, filename=name, local_dir=str(base_dir))
-            logger.info(f"Downloaded {name}.")
-        except Exception as e:
-            logger.error(f"Error downloading {name}: {e}", exc_info=True)
-
-            # unified failure message for ALL asset types
-            repo_url = "https://huggingface.co/pzerr/NIDRA_models"
-            logger.error(
-                "\n--- DOWNLOAD FAILED ---\n"
-                f"Automatic download of one or more required files for '{kind}' has failed.\n"
-                "To continue, please manually download ALL required files from:\n"
-                f"  {repo_url}\n"
-                "Then place them in this directory:\n"
-                f"  {base_dir}\n"
-            )
-            return None
+    failed = []
+    with ThreadPoolExecutor(max_workers=len(missing), thread_name_prefix="nidra-download") as pool:
+        futures = {pool.submit(hf_hub_download, repo_id=repo_id, filename=name, local_dir=str(base_dir)): name
+                   for name in missing}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                future.result()
+                logger.info(f"Downloaded {name}.")
+            except Exception as e:
+                logger.error(f"Error downloading {name}: {e}", exc_info=True)
+                failed.append(name)
+
+    if failed:
+        # unified failure message for ALL asset types
+        repo_url = "https://huggingface.co/pzerr/NIDRA_models"
+        logger.error(
+            "\n--- DOWNLOAD FAILED ---\n"
+            f"Automatic download of one or more required files for '{kind}' has failed.\n"
+            "To continue, please manually download ALL required files from:\n"
+            f"  {repo_url}\n"
+            "Then place them in this directory:\n"
+            f"  {base_dir}\n"
+        )
+        return None
 
     logger.info(f"--- {kind.replace('_', ' ').title()} download complete ---")
     return str(base_dir)
@@ -10,14 +10,13 @@ install_requires = [
     "pandas",
     "matplotlib",
     "Flask",
+    "waitress",
     "huggingface_hub",
     "hf_xet",
     "pydantic-core==2.33.0",
     #"pydantic==2.33.0",
     "appdirs",
-    "requests",
     "pywebview",
-    "psutil",
 ]
  
 # platform-specific dependencies for numpy and onnxruntime